@@ -12,3 +12,14 @@ class ResponseToJSONError(Exception):
 
 class ResponseError(Exception):
     pass
+
+
+class InvalidHomeworkError(Exception):
+    pass
+
+
+class APIStatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f'Сервер вернул ответ с кодом, отличным'
+                         f' от 200: {code}')
+        self.code = code
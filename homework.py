@@ -1,14 +1,27 @@
 import os
+import json
 import logging
+import signal
+import sys
 import time
-from http import HTTPStatus
+from functools import lru_cache
 from json import JSONDecodeError
+from logging.handlers import MemoryHandler, RotatingFileHandler
 
 import requests
 import telegram
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from exceptions import (EmptyResponseError,
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from exceptions import (APIStatusError,
+                        EmptyResponseError,
+                        InvalidHomeworkError,
                         TokenError,
                         ResponseToJSONError,
                         ResponseError)
@@ -21,8 +34,33 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
+IDLE_RETRY_PERIOD = 3600
+ERROR_RETRY_PERIOD = 60
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+# Файл должен лежать в постоянном хранилище: на Heroku файловая
+# система дино очищается при каждом перезапуске.
+STATE_FILE = os.getenv('STATE_FILE', 'last_state.json')
+REQUEST_TIMEOUT = (5, 30)
+REQUEST_RETRIES = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    max_retries=REQUEST_RETRIES, pool_connections=1, pool_maxsize=1
+))
+# Последний разобранный ответ API и его ETag: если сервер ответит 304,
+# повторно используется уже разобранный словарь.
+_response_cache = {'from_date': None, 'etag': None, 'response': None}
+# Параметры запроса переиспользуются: меняется только from_date.
+_payload = {'from_date': 0}
+# Отличает отсутствующий ключ от ключа со значением None.
+_MISSING = object()
 
 
 HOMEWORK_VERDICTS = {
@@ -30,14 +68,11 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+STATUS_TEMPLATES = {
+    status: f'Изменился статус проверки работы "{{name}}". {verdict}'
+    for status, verdict in HOMEWORK_VERDICTS.items()
+}
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.DEBUG,
-    filename='log.log',
-    filemode='w',
-    encoding='utf-8',
-)
 logger = logging.getLogger(__name__)
 
 
@@ -45,21 +80,19 @@ def check_tokens():
     """Функция проверки переменных окружения."""
     """Если хотя бы одна переменная отсутствует,
     выдаст ошибку."""
-    if (PRACTICUM_TOKEN is None or TELEGRAM_TOKEN is None
-            or TELEGRAM_CHAT_ID is None):
-        logger.critical('Один из токенов или несколько не определены')
-        raise TokenError('Один из токенов или несколько не определены')
-    else:
+    if all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)):
         return True
+    logger.critical('Один из токенов или несколько не определены')
+    raise TokenError('Один из токенов или несколько не определены')
 
 
 def send_message(bot, message):
     """Функция отправки сообщений."""
     try:
         bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.debug('Сообщение успешно отправлено')
+        logger.debug('Сообщение успешно отправлено: %s', message)
     except telegram.TelegramError as error:
-        logger.error(f'Ошибка отправки сообщения: {error}')
+        logger.error('Ошибка отправки сообщения: %s', error)
 
 
 def get_api_answer(timestamp):
@@ -67,21 +100,31 @@ def get_api_answer(timestamp):
     """Отправляет запрос к единственному эндпоинту.
     При успешном ответе возвращает статусы домашней работы."""
     try:
-        payload = {
-            'from_date': timestamp
-        }
-        homework_statuses = requests.get(
+        _payload['from_date'] = timestamp
+        headers = HEADERS
+        if (_response_cache['etag']
+                and _response_cache['from_date'] == timestamp):
+            headers = {**HEADERS, 'If-None-Match': _response_cache['etag']}
+        homework_statuses = SESSION.get(
             ENDPOINT,
-            headers=HEADERS,
-            params=payload
+            headers=headers,
+            params=_payload,
+            timeout=REQUEST_TIMEOUT
         )
-        if homework_statuses.status_code != HTTPStatus.OK:
-            raise Exception(f'Сервер вернул ответ с кодом, отличным'
-                            f' от 200: {homework_statuses.status_code}')
+        status_code = homework_statuses.status_code
+        if status_code == 304:
+            return _response_cache['response']
+        if status_code != 200:
+            raise APIStatusError(status_code)
         try:
-            hw_statuses_json = homework_statuses.json()
+            hw_statuses_json = json_loads(homework_statuses.content)
         except JSONDecodeError:
             raise ResponseToJSONError('Ошибка сериализации ответа сервера')
+        _response_cache.update(
+            from_date=timestamp,
+            etag=homework_statuses.headers.get('ETag'),
+            response=hw_statuses_json
+        )
         return hw_statuses_json
     except requests.RequestException:
         raise ResponseError('Ошибка ответа сервера')
@@ -91,13 +134,13 @@ def check_response(response):
     """Функция проверки соответствия ответа документации."""
     if not isinstance(response, dict):
         raise TypeError('Ответ сервера приходит не в виде словаря')
-    if 'homeworks' not in response:
+    homeworks = response.get('homeworks', _MISSING)
+    if homeworks is _MISSING:
         raise EmptyResponseError('Ответ сервера'
                                  ' не содержит ключ homeworks')
     if 'current_date' not in response:
         raise EmptyResponseError('Ответ сервера'
                                  ' не содержит ключ current_date')
-    homeworks = response['homeworks']
     if not isinstance(homeworks, list):
         raise TypeError('Значение с ключом homeworks не является списком')
     return homeworks
@@ -105,49 +148,188 @@ def check_response(response):
 
 def parse_status(homework):
     """Функция проверки статуса домашки."""
-    if 'homework_name' not in homework:
+    homework_name = homework.get('homework_name', _MISSING)
+    if homework_name is _MISSING:
         raise KeyError('Ответ сервера не содержит ключ homework_name')
-    homework_name = homework['homework_name']
-    if 'status' not in homework:
+    if not isinstance(homework_name, str):
+        raise ValueError(f'Сервер передал некорректное'
+                         f' название работы: {homework_name}')
+    verdict = homework.get('status', _MISSING)
+    if verdict is _MISSING:
         raise KeyError('Ответ сервера не содержит ключ status')
-    verdict = homework['status']
-    if verdict not in HOMEWORK_VERDICTS:
+    if verdict not in STATUS_TEMPLATES:
         raise ValueError(f'Сервер передал некорректный'
                          f' или пустой статус: {verdict}')
-    return (
-        f'Изменился статус проверки работы "{homework_name}".'
-        f' {HOMEWORK_VERDICTS[verdict]}'
-    )
+    return _format_status(homework_name, verdict)
+
+
+@lru_cache(maxsize=256)
+def _format_status(homework_name, verdict):
+    """Собирает текст уведомления о смене статуса."""
+    return STATUS_TEMPLATES[verdict].format(name=homework_name)
+
+
+def stop_polling(signum, frame):
+    """Обработчик сигнала завершения процесса."""
+    """Прерывает ожидание между запросами к API,
+    чтобы бот завершился сразу, а не после очередного цикла."""
+    logger.info('Получен сигнал %s, бот остановлен', signum)
+    sys.exit(0)
+
+
+def load_state():
+    """Функция чтения состояния бота с прошлого запуска."""
+    """Возвращает метку времени и статусы работ. Если состояние
+    не сохранялось или повреждено, опрос начинается с текущего момента."""
+    try:
+        with open(STATE_FILE, 'rb') as file:
+            state = json_loads(file.read())
+        timestamp, last_by_name = state['timestamp'], state['last_by_name']
+    except (OSError, ValueError, KeyError, TypeError):
+        return int(time.time()), {}
+    if not isinstance(timestamp, int) or not isinstance(last_by_name, dict):
+        logger.error('Сохранённое состояние повреждено, оно не будет '
+                     'использовано')
+        return int(time.time()), {}
+    return timestamp, last_by_name
+
+
+def save_state(timestamp, last_by_name):
+    """Функция сохранения состояния бота на диск."""
+    """Файл записывается целиком через временный файл,
+    чтобы при сбое не остался наполовину записанный JSON."""
+    tmp_file = f'{STATE_FILE}.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as file:
+            json.dump(
+                {'timestamp': timestamp, 'last_by_name': last_by_name},
+                file,
+                ensure_ascii=False
+            )
+        os.replace(tmp_file, STATE_FILE)
+    except OSError as error:
+        logger.error('Ошибка сохранения состояния: %s', error)
+
+
+def poll_once(bot, timestamp, last_by_name):
+    """Функция одного цикла опроса API."""
+    """Отправляет одно сообщение со всеми изменившимися статусами
+    и запоминает их в last_by_name. Возвращает метку времени
+    для следующего запроса и признак изменения статусов.
+    Некорректные работы не мешают отправке остальных: после отправки
+    выбрасывается InvalidHomeworkError, а метка времени не сдвигается,
+    чтобы эти работы были запрошены снова."""
+    response = get_api_answer(timestamp=timestamp)
+    homeworks = check_response(response)
+    changes = {}
+    messages = []
+    errors = []
+    for homework in homeworks or ():
+        try:
+            if not isinstance(homework, dict):
+                raise TypeError(f'Работа передана не в виде словаря:'
+                                f' {homework}')
+            last_status = last_by_name.get(
+                homework.get('homework_name'), _MISSING
+            )
+            if last_status == homework.get('status'):
+                continue
+            messages.append(parse_status(homework))
+        except (KeyError, ValueError, TypeError) as error:
+            errors.append(str(error))
+            continue
+        changes[homework['homework_name']] = homework['status']
+    if changes:
+        send_message(bot, '\n\n'.join(messages))
+        last_by_name.update(changes)
+        if not errors:
+            timestamp = response['current_date']
+        save_state(timestamp, last_by_name)
+    if errors:
+        raise InvalidHomeworkError(
+            f'Пропущены некорректные работы: {"; ".join(errors)}'
+        )
+    return timestamp, bool(changes)
+
+
+def report_error(bot, error, last_error):
+    """Функция логирования сбоя и уведомления о нём."""
+    """В Telegram сбой отправляется, только если он отличается
+    от предыдущего. Возвращает текст сообщения о сбое."""
+    message = f'Сбой в работе программы: {error}'
+    logger.error(message)
+    if message != last_error:
+        send_message(bot, message)
+    return message
+
+
+def schedule_next_poll(next_poll, interval):
+    """Функция расчёта времени следующего опроса."""
+    """Опрос привязан к монотонным часам: время работы цикла
+    и переводы системных часов не сдвигают расписание. Если цикл
+    затянулся дольше паузы, отсчёт идёт от его конца.
+    Возвращает новый срок опроса и паузу в секундах."""
+    now = time.monotonic()
+    next_poll += interval
+    if next_poll < now:
+        next_poll = now + interval
+    return next_poll, round(next_poll - now)
 
 
 def main():
     """Основная логика работы бота."""
-    if not check_tokens():
-        SystemExit
+    try:
+        check_tokens()
+    except TokenError as error:
+        sys.exit(f'Бот остановлен: {error}')
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    last_status = ''
+    timestamp, last_by_name = load_state()
+    last_error = ''
+    first_poll = True
+    interval = RETRY_PERIOD
+    next_poll = time.monotonic()
     while True:
         try:
-            response = get_api_answer(timestamp=timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                current_status = parse_status(homeworks[0])
+            timestamp, changed = poll_once(bot, timestamp, last_by_name)
+            if changed or first_poll:
+                interval = RETRY_PERIOD
+            else:
+                interval = max(
+                    RETRY_PERIOD, min(interval * 2, IDLE_RETRY_PERIOD)
+                )
+            first_poll = False
+            last_error = ''
+        except APIStatusError as error:
+            last_error = report_error(bot, error, last_error)
+            if error.code >= 500:
+                interval = min(interval, ERROR_RETRY_PERIOD)
             else:
-                current_status = 'Статус отсутствует'
-            if current_status != last_status:
-                send_message(bot, current_status)
-                logger.debug(f'Сообщение успешно отправлено:'
-                             f' {current_status}')
-                last_status = current_status
-                timestamp = response['current_date']
+                interval = RETRY_PERIOD
+        except ResponseError as error:
+            last_error = report_error(bot, error, last_error)
+            interval = min(interval, ERROR_RETRY_PERIOD)
         except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(message)
-            send_message(bot, message)
-        finally:
-            time.sleep(RETRY_PERIOD)
+            last_error = report_error(bot, error, last_error)
+            interval = RETRY_PERIOD
+        next_poll, delay = schedule_next_poll(next_poll, interval)
+        time.sleep(delay)
 
 
 if __name__ == '__main__':
-    main()
+    file_handler = RotatingFileHandler(
+        'log.log', maxBytes=2 ** 20, backupCount=3, encoding='utf-8'
+    )
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    ))
+    logging.basicConfig(
+        level=logging.INFO,
+        handlers=[MemoryHandler(
+            capacity=128, flushLevel=logging.ERROR, target=file_handler
+        )],
+    )
+    signal.signal(signal.SIGTERM, stop_polling)
+    try:
+        main()
+    except KeyboardInterrupt:
+        logger.info('Бот остановлен пользователем')
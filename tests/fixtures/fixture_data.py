@@ -17,6 +17,14 @@ def current_timestamp():
     return int(datetime.now().timestamp())
 
 
+@pytest.fixture(autouse=True)
+def state_file(monkeypatch, tmp_path):
+    import homework
+    path = tmp_path / 'state.json'
+    monkeypatch.setattr(homework, 'STATE_FILE', str(path))
+    return path
+
+
 @pytest.fixture
 def homework_module():
     import homework
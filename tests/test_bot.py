@@ -36,6 +36,46 @@ def get_mock_telegram_bot(monkeypatch, random_message):
     return telegram.Bot(token='')
 
 
+def run_main_with_poll_results(monkeypatch, homework_module, poll_results,
+                               cycle_seconds=0):
+    """
+    Run main() with poll_once() returning or raising the given results
+    one by one and return the list of pauses between the polls.
+    Each poll_once() call takes cycle_seconds on the mocked clock.
+    """
+    homework_module.PRACTICUM_TOKEN = 'sometoken'
+    homework_module.TELEGRAM_TOKEN = '1234:abcdefg'
+    homework_module.TELEGRAM_CHAT_ID = '12345'
+    get_mock_telegram_bot(monkeypatch, '')
+    monkeypatch.setattr(
+        homework_module, 'send_message', lambda bot, message: None
+    )
+    results = iter(poll_results)
+    clock = [0]
+
+    def mock_poll_once(bot, timestamp, last_by_name):
+        clock[0] += cycle_seconds
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(homework_module, 'poll_once', mock_poll_once)
+    sleeps = []
+
+    def mock_sleep(secs):
+        sleeps.append(secs)
+        clock[0] += secs
+        if len(sleeps) == len(poll_results):
+            raise utils.BreakInfiniteLoop('break')
+
+    monkeypatch.setattr(time, 'sleep', mock_sleep)
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    with pytest.raises(utils.BreakInfiniteLoop):
+        homework_module.main()
+    return sleeps
+
+
 class TestHomework:
     HOMEWORK_VERDICTS = {
         'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -192,7 +232,9 @@ class TestHomework:
                     'Проверьте, что в параметре `from_date` передано число.'
                 )
 
-        monkeypatch.setattr(requests, 'get', check_request_get_call)
+        monkeypatch.setattr(
+            homework_module.SESSION, 'get', check_request_get_call
+        )
         try:
             homework_module.get_api_answer(current_timestamp)
         except AssertionError as e:
@@ -215,7 +257,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(homework_module.SESSION, 'get', mock_response_get)
 
         result = homework_module.get_api_answer(current_timestamp)
         assert isinstance(result, dict), (
@@ -235,7 +277,7 @@ class TestHomework:
             self.HOMEWORK_FUNC_WITH_PARAMS_QTY[func_name]
         )
 
-        monkeypatch.setattr(requests, 'get', response)
+        monkeypatch.setattr(homework_module.SESSION, 'get', response)
         try:
             homework_module.get_api_answer(current_timestamp)
         except Exception:
@@ -259,7 +301,9 @@ class TestHomework:
         def mock_request_get_with_exception(*args, **kwargs):
             raise requests.RequestException('Something wrong')
 
-        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        monkeypatch.setattr(
+            homework_module.SESSION, 'get', mock_request_get_with_exception
+        )
         try:
             homework_module.get_api_answer(current_timestamp)
         except requests.RequestException:
@@ -271,6 +315,57 @@ class TestHomework:
         except Exception:
             pass
 
+    def test_get_api_answer_not_modified(self, monkeypatch, random_timestamp,
+                                         current_timestamp, homework_module):
+        func_name = 'get_api_answer'
+        monkeypatch.setattr(
+            homework_module,
+            '_response_cache',
+            {'from_date': None, 'etag': None, 'response': None}
+        )
+        data = {
+            'homeworks': [
+                {
+                    'homework_name': 'hw123',
+                    'status': 'approved'
+                }
+            ],
+            'current_date': random_timestamp
+        }
+        mock_response_get = (
+            create_mock_response_get_with_custom_status_and_data(
+                random_timestamp=random_timestamp,
+                http_status=HTTPStatus.OK,
+                data=data
+            ))
+
+        def mock_response_get_with_etag(*args, **kwargs):
+            response = mock_response_get(*args, **kwargs)
+            response.headers = {'ETag': '"etag"'}
+            return response
+
+        monkeypatch.setattr(
+            homework_module.SESSION, 'get', mock_response_get_with_etag
+        )
+        homework_module.get_api_answer(current_timestamp)
+
+        def mock_not_modified(*args, **kwargs):
+            assert kwargs['headers'].get('If-None-Match') == '"etag"', (
+                f'Проверьте, что функция `{func_name}` передаёт ETag '
+                'предыдущего ответа в заголовке `If-None-Match`.'
+            )
+            return utils.MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                http_status=HTTPStatus.NOT_MODIFIED, **kwargs
+            )
+
+        monkeypatch.setattr(homework_module.SESSION, 'get', mock_not_modified)
+        result = homework_module.get_api_answer(current_timestamp)
+        assert result == data, (
+            f'Проверьте, что при ответе 304 функция `{func_name}` '
+            'возвращает ранее полученный ответ.'
+        )
+
     def test_parse_status_with_expected_statuses(self, homework_module):
         func_name = 'parse_status'
         utils.check_function(
@@ -374,6 +469,13 @@ class TestHomework:
                 '`homework_name`.'
             )
 
+    def test_parse_status_with_invalid_homework_name(self, homework_module):
+        for homework_name in (['hw123'], {'name': 'hw123'}, None):
+            with pytest.raises(ValueError):
+                homework_module.parse_status(
+                    {'homework_name': homework_name, 'status': 'approved'}
+                )
+
     def test_check_response(self, random_timestamp, homework_module):
         func_name = 'check_response'
         utils.check_function(
@@ -448,6 +550,26 @@ class TestHomework:
             else:
                 raise AssertionError(assert_message)
 
+    def test_check_response_homeworks_is_none(self, homework_module):
+        func_name = 'check_response'
+        try:
+            homework_module.check_response(
+                {'homeworks': None, 'current_date': 123246}
+            )
+        except TypeError:
+            pass
+        except Exception:
+            raise AssertionError(
+                f'Убедитесь, что функция `{func_name}` выбрасывает '
+                '`TypeError`, если ключ `homeworks` есть, но его значение '
+                'не является списком.'
+            )
+        else:
+            raise AssertionError(
+                f'Убедитесь, что функция `{func_name}` выбрасывает '
+                'исключение, если значение `homeworks` равно `None`.'
+            )
+
     def test_send_message(self, monkeypatch, random_message,
                           caplog, homework_module):
         homework_module.PRACTICUM_TOKEN = 'sometoken'
@@ -587,7 +709,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(homework_module.SESSION, 'get', mock_response_get)
 
     def test_main_without_env_vars_raise_exception(
             self, caplog, monkeypatch, random_timestamp, current_timestamp,
@@ -641,7 +763,7 @@ class TestHomework:
                     if record.message == utils.MockResponseGET.CALLED_LOG_MSG
                 ]
                 assert log_record, (
-                    'Убедитесь, что бот использует функцию `requests.get()` '
+                    'Убедитесь, что бот использует метод `SESSION.get()` '
                     'для отправки запроса к API домашки.'
                 )
 
@@ -724,7 +846,7 @@ class TestHomework:
                 data=data_with_new_hw_status
             ))
         monkeypatch.setattr(
-            requests,
+            homework_module.SESSION,
             'get',
             mock_response_get_with_new_status
         )
@@ -753,6 +875,231 @@ class TestHomework:
                     'из переменной `HOMEWORK_VERDICTS`.'
                 )
 
+    def test_poll_once_sends_changes_in_one_message(self, monkeypatch,
+                                                    random_timestamp,
+                                                    current_timestamp,
+                                                    homework_module):
+        data = {
+            'homeworks': [
+                {
+                    'homework_name': 'hw123',
+                    'status': 'approved'
+                },
+                {
+                    'homework_name': 'hw456',
+                    'status': 'reviewing'
+                }
+            ],
+            'current_date': random_timestamp
+        }
+        monkeypatch.setattr(
+            homework_module.SESSION,
+            'get',
+            create_mock_response_get_with_custom_status_and_data(
+                random_timestamp=random_timestamp,
+                http_status=HTTPStatus.OK,
+                data=data
+            )
+        )
+        sent_messages = []
+
+        def mock_send_message(bot, message=''):
+            sent_messages.append(message)
+
+        monkeypatch.setattr(homework_module, 'send_message', mock_send_message)
+        last_by_name = {}
+        timestamp, changed = homework_module.poll_once(
+            None, current_timestamp, last_by_name
+        )
+        assert changed and timestamp == random_timestamp
+        assert len(sent_messages) == 1, (
+            'Убедитесь, что изменения статусов нескольких работ '
+            'отправляются одним сообщением.'
+        )
+        for verdict in ('approved', 'reviewing'):
+            assert self.HOMEWORK_VERDICTS[verdict] in sent_messages[0]
+        assert last_by_name == {'hw123': 'approved', 'hw456': 'reviewing'}
+
+        timestamp, changed = homework_module.poll_once(
+            None, timestamp, last_by_name
+        )
+        assert not changed and timestamp == random_timestamp
+        assert len(sent_messages) == 1, (
+            'Убедитесь, что бот не отправляет повторно уже известные статусы.'
+        )
+
+    def test_poll_once_skips_invalid_homework(self, monkeypatch,
+                                              random_timestamp,
+                                              current_timestamp,
+                                              homework_module):
+        import exceptions
+
+        data = {
+            'homeworks': [
+                'not a homework',
+                {
+                    'homework_name': ['hw_unhashable'],
+                    'status': 'approved'
+                },
+                {
+                    'homework_name': 'hw_invalid',
+                    'status': 'unknown'
+                },
+                {
+                    'homework_name': 'hw123',
+                    'status': 'approved'
+                }
+            ],
+            'current_date': random_timestamp
+        }
+        monkeypatch.setattr(
+            homework_module.SESSION,
+            'get',
+            create_mock_response_get_with_custom_status_and_data(
+                random_timestamp=random_timestamp,
+                http_status=HTTPStatus.OK,
+                data=data
+            )
+        )
+        sent_messages = []
+
+        def mock_send_message(bot, message=''):
+            sent_messages.append(message)
+
+        monkeypatch.setattr(homework_module, 'send_message', mock_send_message)
+        last_by_name = {}
+        with pytest.raises(exceptions.InvalidHomeworkError) as error:
+            homework_module.poll_once(None, current_timestamp, last_by_name)
+        assert 'hw_invalid' not in last_by_name
+        assert 'unknown' in str(error.value)
+        assert len(sent_messages) == 1, (
+            'Убедитесь, что некорректная работа в ответе API не мешает '
+            'отправить изменения остальных работ.'
+        )
+        assert self.HOMEWORK_VERDICTS['approved'] in sent_messages[0]
+        assert last_by_name == {'hw123': 'approved'}
+
+        homework_module.PRACTICUM_TOKEN = 'sometoken'
+        homework_module.TELEGRAM_TOKEN = '1234:abcdefg'
+        homework_module.TELEGRAM_CHAT_ID = '12345'
+        get_mock_telegram_bot(monkeypatch, '')
+        sleeps = []
+
+        def mock_sleep(secs):
+            sleeps.append(secs)
+            raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(time, 'sleep', mock_sleep)
+        sent_messages.clear()
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        error_reports = [
+            message for message in sent_messages
+            if message.startswith('Сбой в работе программы')
+        ]
+        assert len(error_reports) == 1, (
+            'Убедитесь, что о пропущенных работах бот сообщает в Telegram.'
+        )
+        assert sleeps == [self.RETRY_PERIOD], (
+            'Убедитесь, что при некорректных данных бот не увеличивает '
+            'паузу между запросами.'
+        )
+
+    def test_state_is_restored_after_restart(self, state_file,
+                                             random_timestamp,
+                                             homework_module):
+        assert homework_module.load_state()[1] == {}, (
+            'Убедитесь, что без сохранённого состояния `load_state()` '
+            'возвращает пустые статусы.'
+        )
+        last_by_name = {'hw123': 'approved', 'Итоговый проект': 'reviewing'}
+        homework_module.save_state(random_timestamp, last_by_name)
+        assert homework_module.load_state() == (
+            random_timestamp, last_by_name
+        ), (
+            'Убедитесь, что `load_state()` возвращает состояние, '
+            'сохранённое `save_state()`.'
+        )
+
+        for corrupted in ('{"timestamp":',
+                          '{"timestamp": "abc", "last_by_name": []}'):
+            state_file.write_text(corrupted)
+            timestamp, last_by_name = homework_module.load_state()
+            assert isinstance(timestamp, int) and last_by_name == {}, (
+                'Убедитесь, что повреждённый файл состояния не ломает бота.'
+            )
+
+    def test_main_adapts_retry_interval(self, monkeypatch, homework_module):
+        import exceptions
+
+        sleeps = run_main_with_poll_results(monkeypatch, homework_module, [
+            (0, True),
+            exceptions.ResponseError('Ошибка ответа сервера'),
+            (0, False),
+            (0, False),
+            (0, False),
+            (0, False),
+            (0, False),
+        ])
+        assert sleeps == [600, 60, 600, 1200, 2400, 3600, 3600], (
+            'Убедитесь, что после сбоя пауза между запросами возвращается '
+            'к `RETRY_PERIOD` и растёт, пока статусы не меняются.'
+        )
+
+    def test_main_retry_interval_on_api_status_error(self, monkeypatch,
+                                                     homework_module):
+        import exceptions
+
+        sleeps = run_main_with_poll_results(monkeypatch, homework_module, [
+            (0, True),
+            exceptions.APIStatusError(503),
+            exceptions.APIStatusError(401),
+        ])
+        assert sleeps == [600, 60, 600], (
+            'Убедитесь, что после ответа 5xx запрос повторяется через '
+            '`ERROR_RETRY_PERIOD`, а после ответа 4xx — через `RETRY_PERIOD`.'
+        )
+
+    def test_main_retry_interval_on_unexpected_error(self, monkeypatch,
+                                                     homework_module):
+        import exceptions
+
+        sleeps = run_main_with_poll_results(monkeypatch, homework_module, [
+            (0, True),
+            exceptions.ResponseError('Ошибка ответа сервера'),
+            RuntimeError('Что-то пошло не так'),
+        ])
+        assert sleeps == [600, 60, 600], (
+            'Убедитесь, что после непредвиденной ошибки запрос повторяется '
+            'через `RETRY_PERIOD`.'
+        )
+
+    def test_main_exits_with_error_code_without_tokens(self, monkeypatch,
+                                                       homework_module):
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', None)
+        get_mock_telegram_bot(monkeypatch, '')
+        with pytest.raises(SystemExit) as error:
+            homework_module.main()
+        assert error.value.code not in (None, 0), (
+            'Убедитесь, что без переменных окружения бот завершается '
+            'с ненулевым кодом возврата.'
+        )
+
+    def test_main_sleeps_after_slow_failed_cycle(self, monkeypatch,
+                                                 homework_module):
+        import exceptions
+
+        sleeps = run_main_with_poll_results(
+            monkeypatch,
+            homework_module,
+            [exceptions.ResponseError('Ошибка ответа сервера')] * 5,
+            cycle_seconds=123
+        )
+        assert sleeps == [60] * 5, (
+            'Убедитесь, что после цикла, который длился дольше паузы, '
+            'бот всё равно ждёт перед следующим запросом.'
+        )
+
     def test_docstrings(self, homework_module):
         for func in self.HOMEWORK_FUNC_WITH_PARAMS_QTY:
             utils.check_docstring(homework_module, func)
@@ -1,3 +1,4 @@
+import json
 import logging
 from collections import namedtuple
 from contextlib import contextmanager
@@ -81,8 +82,13 @@ class MockResponseGET:
         self.status_code = http_status
         self.reason = ''
         self.text = ''
+        self.headers = {}
         logging.warn(MockResponseGET.CALLED_LOG_MSG)
 
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
+
     def json(self):
         data = {
             "homeworks": [],